@@ -1,3 +1,4 @@
+from configs import CONTENT_HASH_METADATA_KEY
 from gemini_client import client as _default_client
 
 
@@ -20,3 +21,27 @@ def check_docs(store, client=None) -> list[str]:
     ):
         names.append(document.display_name or "Unnamed document")
     return names
+
+
+def check_doc_hashes(store, client=None) -> dict[str, str]:
+    """Return {display name: content hash} for documents tagged with a content hash.
+
+    Documents uploaded before hashes were recorded are omitted.
+
+    Args:
+        store: The file search store to list documents from.
+        client: Optional Gemini client. Defaults to the module-level singleton.
+    """
+    _client = client if client is not None else _default_client
+    if _client is None:
+        raise ValueError(
+            "No Gemini client available. Set the GEMINI_API_KEY environment variable."
+        )
+    hashes: dict[str, str] = {}
+    for document in _client.file_search_stores.documents.list(
+        parent=store.name if store.name else "no_name_found"
+    ):
+        for item in document.custom_metadata or []:
+            if item.key == CONTENT_HASH_METADATA_KEY and item.string_value:
+                hashes[document.display_name or "Unnamed document"] = item.string_value
+    return hashes
@@ -1,5 +1,12 @@
+import re
+
 from google.genai.types import Candidate
 
+from passage_index import locate_passage
+
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*_\[\]<>#|~])")
+_WHITESPACE = re.compile(r"\s+")
+
 
 def cite_documents(candidate: Candidate | None) -> str:
     if not candidate:
@@ -16,3 +23,40 @@ def cite_documents(candidate: Candidate | None) -> str:
         return "No citations found in the candidates."
 
     return "\n".join(f"- {citation}" for citation in citations)
+
+
+def _inline(text: str) -> str:
+    """Collapse whitespace and escape Markdown so a snippet renders on one line."""
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", _WHITESPACE.sub(" ", text))
+
+
+def cite_passages(candidate: Candidate | None, store_name: str) -> str:
+    """Like cite_documents, but quote each chunk's located passage under its title.
+
+    The passage is highlighted in bold with its character offsets; chunks that
+    cannot be located in the local passage index fall back to the title only.
+    """
+    if not candidate:
+        return "No candidates available."
+
+    lines = []
+    grounding_metadata = candidate.grounding_metadata
+    if grounding_metadata and grounding_metadata.grounding_chunks:
+        for chunk in grounding_metadata.grounding_chunks:
+            context = chunk.retrieved_context
+            if not context:
+                continue
+            lines.append(f"- {context.title}")
+            if not (context.title and context.text):
+                continue
+            passage = locate_passage(store_name, context.title, context.text)
+            if passage:
+                lines.append(
+                    f"  > …{_inline(passage.before)}**{_inline(passage.match)}**"
+                    f"{_inline(passage.after)}… _(chars {passage.start}–{passage.end})_"
+                )
+
+    if not lines:
+        return "No citations found in the candidates."
+
+    return "\n".join(lines)
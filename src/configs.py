@@ -9,3 +9,25 @@ SUPPORTED_FILETYPES = [
     ("Supported files", "*.pdf *.txt *.html *.htm *.csv *.md *.xml"),
     ("All files", "*.*"),
 ]
+
+# Bulk ingestion journal (resumable upload jobs)
+INGEST_JOURNAL_PATH = "./.ingest/journal.sqlite3"
+UPLOAD_POLL_SECONDS = 2
+INGEST_LEASE_SECONDS = 30  # a job whose runner stops renewing is resumable after this
+CONTENT_HASH_METADATA_KEY = "sha256"  # document metadata tagging uploaded content
+
+# Streamlit session memory bounds
+PENDING_MEMORY_LIMIT_BYTES = 8 * 1024 * 1024  # staged uploads kept in RAM per session
+PENDING_SPILL_DIR = "./.pending/"  # staged uploads beyond the limit are spilled here
+MAX_CHAT_MESSAGES = 200  # oldest messages are dropped beyond this, per session
+
+# Extended citations: local passage index built from staged text at upload time
+EXTENDED_CITATIONS = False  # default for the CLI and the UI toggle
+PASSAGE_INDEX_DIR = "./.passages/"
+PASSAGE_CACHE_SIZE = 1024  # located passages cached per (document, chunk hash)
+PASSAGE_DOC_CACHE_BYTES = 64 * 1024 * 1024  # estimated heap of loaded document indexes
+PASSAGE_SNIPPET_CONTEXT = 80  # characters shown on each side of a match
+
+# Store snapshots (export/import for fast environment warm-up)
+SNAPSHOT_UPLOAD_WORKERS = 8  # concurrent uploads when importing a snapshot
+SNAPSHOT_STAGING_DIR = "./.ingest/snapshots/"  # a directory per import
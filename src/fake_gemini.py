@@ -0,0 +1,198 @@
+"""
+In-process fake of the slice of the Gemini client this app uses.
+
+Implements just enough of `genai.Client` — model listing, file search stores,
+uploads with long-running operations, and streamed generation with grounding
+metadata — to drive the CLI or Streamlit UI without network access or an API
+key. Latencies are configurable so the load-testing harness can model a
+realistic backend. Responses are built from real `google.genai.types`
+objects, so callers cannot tell the difference.
+"""
+
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+
+from google.genai import types
+
+_WORDS = (
+    "the roadmap covers discovery design build launch and review stages "
+    "with grounded answers drawn from your indexed documents"
+).split()
+
+
+class _FakeModels:
+    def __init__(self, backend: "FakeGeminiClient"):
+        self._backend = backend
+
+    def list(self) -> Iterator[types.Model]:
+        return iter([types.Model(name="models/fake-gemini")])
+
+    def generate_content_stream(
+        self, *, model: str, contents, config=None
+    ) -> Iterator[types.GenerateContentResponse]:
+        backend = self._backend
+        store_names: list[str] = []
+        if config and config.tools:
+            for tool in config.tools:
+                if tool.file_search:
+                    store_names.extend(tool.file_search.file_search_store_names or [])
+
+        time.sleep(backend.first_token_latency)
+        with backend._lock:
+            backend.first_token_times.append(time.perf_counter())
+        words = itertools.islice(itertools.cycle(_WORDS), backend.response_tokens)
+        for word in words:
+            yield types.GenerateContentResponse(
+                candidates=[
+                    types.Candidate(
+                        content=types.Content(
+                            role="model", parts=[types.Part(text=word + " ")]
+                        )
+                    )
+                ]
+            )
+            time.sleep(backend.token_interval)
+
+        with backend._lock:
+            cited = [
+                (title, backend._passages.get(title, ""))
+                for name in store_names
+                for title in backend._documents.get(name, [])
+            ]
+        yield types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(
+                    content=types.Content(role="model", parts=[types.Part(text="")]),
+                    grounding_metadata=types.GroundingMetadata(
+                        grounding_chunks=[
+                            types.GroundingChunk(
+                                retrieved_context=types.GroundingChunkRetrievedContext(
+                                    title=title, text=text
+                                )
+                            )
+                            for title, text in cited[:3]
+                        ]
+                    ),
+                )
+            ]
+        )
+
+
+class _FakeDocuments:
+    def __init__(self, backend: "FakeGeminiClient"):
+        self._backend = backend
+
+    def list(self, *, parent: str) -> Iterator[types.Document]:
+        backend = self._backend
+        with backend._lock:
+            documents = [
+                types.Document(
+                    display_name=name,
+                    custom_metadata=backend._metadata.get((parent, name)),
+                )
+                for name in backend._documents.get(parent, [])
+            ]
+        return iter(documents)
+
+
+class _FakeFileSearchStores:
+    def __init__(self, backend: "FakeGeminiClient"):
+        self._backend = backend
+        self.documents = _FakeDocuments(backend)
+
+    def create(self, *, config=None) -> types.FileSearchStore:
+        backend = self._backend
+        with backend._lock:
+            name = f"fileSearchStores/fake-{uuid.uuid4().hex[:12]}"
+            backend._documents[name] = []
+        display_name = (config or {}).get("display_name")
+        return types.FileSearchStore(name=name, display_name=display_name)
+
+    def get(self, *, name: str) -> types.FileSearchStore:
+        if name not in self._backend._documents:
+            raise ValueError(f"Unknown file search store: {name}")
+        return types.FileSearchStore(name=name)
+
+    def upload_to_file_search_store(
+        self, *, file: str, file_search_store_name: str, config=None
+    ) -> types.UploadToFileSearchStoreOperation:
+        backend = self._backend
+        if not os.path.isfile(file):
+            raise FileNotFoundError(file)
+        config = config or {}
+        display_name = config.get("display_name") or os.path.basename(file)
+        metadata = [
+            types.CustomMetadata(**item) for item in config.get("custom_metadata", [])
+        ]
+        with open(file, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        # Quote a slice from the middle of the file as this document's chunk.
+        start = len(text) // 3
+        with backend._lock:
+            backend._passages[display_name] = text[start : start + 300]
+            name = f"{file_search_store_name}/upload/operations/{next(backend._ids)}"
+            backend._operations[name] = (
+                time.monotonic() + backend.index_latency,
+                file_search_store_name,
+                display_name,
+                metadata,
+            )
+        return types.UploadToFileSearchStoreOperation(name=name, done=False)
+
+
+class _FakeOperations:
+    def __init__(self, backend: "FakeGeminiClient"):
+        self._backend = backend
+
+    def get(self, operation):
+        backend = self._backend
+        with backend._lock:
+            entry = backend._operations.get(operation.name)
+            if entry is None:
+                raise ValueError(f"Unknown operation: {operation.name}")
+            ready_at, store_name, display_name, metadata = entry
+            done = time.monotonic() >= ready_at
+            if done and display_name not in backend._documents[store_name]:
+                backend._documents[store_name].append(display_name)
+                backend._metadata[(store_name, display_name)] = metadata
+        return types.UploadToFileSearchStoreOperation(name=operation.name, done=done)
+
+
+class FakeGeminiClient:
+    """Drop-in stand-in for `genai.Client` with configurable latencies.
+
+    Args:
+        first_token_latency: Seconds before the first streamed chunk.
+        token_interval: Seconds between streamed chunks.
+        response_tokens: Number of text chunks per response.
+        index_latency: Seconds before an upload operation reports done.
+    """
+
+    def __init__(
+        self,
+        first_token_latency: float = 0.3,
+        token_interval: float = 0.01,
+        response_tokens: int = 40,
+        index_latency: float = 0.5,
+    ):
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        self.response_tokens = response_tokens
+        self.index_latency = index_latency
+        # perf_counter() timestamps at which each response's first chunk was produced.
+        self.first_token_times: list[float] = []
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._documents: dict[str, list[str]] = {}
+        self._passages: dict[str, str] = {}  # display name → quoted chunk text
+        self._metadata: dict[tuple[str, str], list[types.CustomMetadata]] = {}
+        self._operations: dict[str, tuple[float, str, str, list]] = {}
+
+        self.models = _FakeModels(self)
+        self.file_search_stores = _FakeFileSearchStores(self)
+        self.operations = _FakeOperations(self)
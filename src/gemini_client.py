@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 from dotenv import load_dotenv
@@ -14,6 +15,20 @@ _env_key = os.getenv("GEMINI_API_KEY")
 client: genai.Client | None = genai.Client(api_key=_env_key) if _env_key else None
 
 
+def key_fingerprint(api_key: str | None) -> str | None:
+    """Return a short, non-reversible id for an API key (None without a key).
+
+    Upload jobs are tagged with it so they are only resumed by their owner.
+    """
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+# Fingerprint of GEMINI_API_KEY, the owner of upload jobs started by the CLI.
+client_fingerprint: str | None = key_fingerprint(_env_key)
+
+
 def create_client(api_key: str) -> genai.Client:
     """Create and return a new Gemini client for the given API key."""
     return genai.Client(api_key=api_key)
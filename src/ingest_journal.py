@@ -0,0 +1,299 @@
+"""
+Ingestion job journal.
+
+Records the per-file state of bulk upload jobs in a small SQLite database so
+that an interrupted ingestion (Ctrl-C, a crashed worker, a network blip) can
+be resumed instead of restarted. This module only persists state — the
+Gemini calls that drive a job live in `upload_docs`.
+
+File lifecycle: staged → uploading (operation name recorded) → indexed | failed.
+Files of a job that is dropped before finishing are marked abandoned.
+
+Each job records its owner (a fingerprint of the API key whose store it
+fills) and a lease held by whichever process is running it, so a job is
+only ever resumed by its owner and never by two workers at once.
+"""
+
+import os
+import sqlite3
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+
+from configs import INGEST_JOURNAL_PATH
+
+STAGED = "staged"
+UPLOADING = "uploading"
+INDEXED = "indexed"
+FAILED = "failed"
+ABANDONED = "abandoned"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    store_name  TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    owner       TEXT,
+    lease_token TEXT,
+    lease_until REAL,
+    source_dir  TEXT
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id          TEXT NOT NULL REFERENCES jobs(job_id),
+    filename        TEXT NOT NULL,
+    state           TEXT NOT NULL,
+    operation_name  TEXT,
+    error           TEXT,
+    updated_at      REAL NOT NULL,
+    PRIMARY KEY (job_id, filename)
+);
+"""
+
+# Columns added to `jobs` after its first release, for journals created before.
+_ADDED_JOB_COLUMNS = {
+    "owner": "TEXT",
+    "lease_token": "TEXT",
+    "lease_until": "REAL",
+    "source_dir": "TEXT",
+}
+
+
+@dataclass(frozen=True)
+class JobProgress:
+    """Snapshot of a job's per-state file counts."""
+
+    job_id: str
+    store_name: str
+    total: int
+    staged: int
+    uploading: int
+    indexed: int
+    failed: int
+    abandoned: int
+    owner: str | None
+    lease_until: float | None
+    source_dir: str | None  # None for jobs staged in DOCS_DIR
+
+    @property
+    def finished(self) -> bool:
+        """True once no file is left staged or uploading."""
+        return self.staged + self.uploading == 0
+
+    @property
+    def leased(self) -> bool:
+        """True while some process holds an unexpired lease on the job."""
+        return self.lease_until is not None and self.lease_until > time.time()
+
+
+@contextmanager
+def _journal() -> Iterator[sqlite3.Connection]:
+    """Open the journal, commit on success, and always close the connection.
+
+    A fresh connection per call keeps the journal safe to use from the
+    background ingestion threads as well as the Streamlit script thread.
+    """
+    directory = os.path.dirname(INGEST_JOURNAL_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with closing(sqlite3.connect(INGEST_JOURNAL_PATH, timeout=30)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        with conn:
+            yield conn
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Add columns missing from a journal created by an earlier version."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, kind in _ADDED_JOB_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+
+def create_job(
+    store_name: str,
+    filenames: list[str],
+    owner: str | None = None,
+    source_dir: str | None = None,
+) -> str:
+    """Record a new job for the given store with every file staged.
+
+    Returns the new job id.
+
+    Args:
+        store_name: The file search store the files are uploaded to.
+        filenames: Basenames of the staged files.
+        owner: Fingerprint of the API key the store belongs to.
+        source_dir: Directory the files are staged in, if not DOCS_DIR.
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _journal() as conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, store_name, created_at, owner, source_dir) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (job_id, store_name, now, owner, source_dir),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO job_files (job_id, filename, state, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(job_id, name, STAGED, now) for name in filenames],
+        )
+    return job_id
+
+
+def open_files(job_id: str) -> list[tuple[str, str, str | None]]:
+    """Return (filename, state, operation_name) for files not yet indexed or failed."""
+    with _journal() as conn:
+        rows = conn.execute(
+            "SELECT filename, state, operation_name FROM job_files "
+            "WHERE job_id = ? AND state IN (?, ?) ORDER BY filename",
+            (job_id, STAGED, UPLOADING),
+        ).fetchall()
+    return [(name, state, op) for name, state, op in rows]
+
+
+def failed_files(job_id: str) -> list[tuple[str, str]]:
+    """Return (filename, error) for every failed file in the job."""
+    with _journal() as conn:
+        rows = conn.execute(
+            "SELECT filename, error FROM job_files "
+            "WHERE job_id = ? AND state = ? ORDER BY filename",
+            (job_id, FAILED),
+        ).fetchall()
+    return [(name, error or "Unknown error") for name, error in rows]
+
+
+def set_file_state(
+    job_id: str,
+    filename: str,
+    state: str,
+    operation_name: str | None = None,
+    error: str | None = None,
+) -> None:
+    """Update a file's state, keeping its recorded operation name unless a new one is given.
+
+    Abandoned files are left alone, so a worker still winding down after its
+    job was dropped cannot revive it.
+    """
+    with _journal() as conn:
+        conn.execute(
+            "UPDATE job_files SET state = ?, "
+            "operation_name = COALESCE(?, operation_name), error = ?, updated_at = ? "
+            "WHERE job_id = ? AND filename = ? AND state != ?",
+            (state, operation_name, error, time.time(), job_id, filename, ABANDONED),
+        )
+
+
+def abandon_job(job_id: str) -> int:
+    """Mark a job's staged and uploading files abandoned so it is never resumed.
+
+    Returns the number of files abandoned.
+    """
+    with _journal() as conn:
+        cursor = conn.execute(
+            "UPDATE job_files SET state = ?, updated_at = ? "
+            "WHERE job_id = ? AND state IN (?, ?)",
+            (ABANDONED, time.time(), job_id, STAGED, UPLOADING),
+        )
+    return cursor.rowcount
+
+
+def claim_job(job_id: str, lease_seconds: float) -> str | None:
+    """Take the job's lease unless another worker holds an unexpired one.
+
+    Returns the lease token to renew and release it with, or None if the job
+    is already being run.
+    """
+    token = uuid.uuid4().hex
+    now = time.time()
+    with _journal() as conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET lease_token = ?, lease_until = ? WHERE job_id = ? "
+            "AND (lease_until IS NULL OR lease_until <= ?)",
+            (token, now + lease_seconds, job_id, now),
+        )
+    return token if cursor.rowcount else None
+
+
+def renew_lease(job_id: str, token: str, lease_seconds: float) -> bool:
+    """Extend a held lease; returns False if it has been lost to another worker."""
+    with _journal() as conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND lease_token = ?",
+            (time.time() + lease_seconds, job_id, token),
+        )
+    return bool(cursor.rowcount)
+
+
+def release_job(job_id: str, token: str) -> None:
+    """Give up a held lease so the job can be resumed right away."""
+    with _journal() as conn:
+        conn.execute(
+            "UPDATE jobs SET lease_token = NULL, lease_until = NULL "
+            "WHERE job_id = ? AND lease_token = ?",
+            (job_id, token),
+        )
+
+
+def retry_failed(job_id: str) -> int:
+    """Move failed files back to staged so the next run re-uploads them.
+
+    Returns the number of files re-staged.
+    """
+    with _journal() as conn:
+        cursor = conn.execute(
+            "UPDATE job_files SET state = ?, operation_name = NULL, error = NULL, "
+            "updated_at = ? WHERE job_id = ? AND state = ?",
+            (STAGED, time.time(), job_id, FAILED),
+        )
+    return cursor.rowcount
+
+
+def get_progress(job_id: str) -> JobProgress | None:
+    """Return the progress snapshot for a job, or None if it is unknown."""
+    with _journal() as conn:
+        job = conn.execute(
+            "SELECT store_name, owner, lease_until, source_dir FROM jobs "
+            "WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if job is None:
+            return None
+        counts = dict(
+            conn.execute(
+                "SELECT state, COUNT(*) FROM job_files WHERE job_id = ? GROUP BY state",
+                (job_id,),
+            ).fetchall()
+        )
+    return JobProgress(
+        job_id=job_id,
+        store_name=job[0],
+        total=sum(counts.values()),
+        staged=counts.get(STAGED, 0),
+        uploading=counts.get(UPLOADING, 0),
+        indexed=counts.get(INDEXED, 0),
+        failed=counts.get(FAILED, 0),
+        abandoned=counts.get(ABANDONED, 0),
+        owner=job[1],
+        lease_until=job[2],
+        source_dir=job[3],
+    )
+
+
+def unfinished_jobs() -> list[JobProgress]:
+    """Return progress for every job that still has staged or uploading files, oldest first."""
+    with _journal() as conn:
+        job_ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT j.job_id FROM jobs j "
+                "JOIN job_files f ON f.job_id = j.job_id "
+                "WHERE f.state IN (?, ?) ORDER BY j.created_at",
+                (STAGED, UPLOADING),
+            ).fetchall()
+        ]
+    return [p for job_id in job_ids if (p := get_progress(job_id)) is not None]
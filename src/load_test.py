@@ -0,0 +1,321 @@
+"""
+Load-testing harness for the Streamlit UI.
+
+Drives streamlit_app.py headlessly with `streamlit.testing.v1.AppTest`, one
+app instance per simulated user, each backed by its own `FakeGeminiClient`
+so no API key or network access is needed. Every user stages and indexes a
+few documents, then sends chat turns separated by randomized think times.
+
+Reports throughput, time-to-first-token (TTFT) percentiles, script rerun
+durations, indexing time, and CPU and memory per session — enough to size a
+worker and to catch regressions between runs (use --json to keep results).
+
+Run from the project root:
+  uv run python src/load_test.py --users 20 --turns 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import AppTest
+
+import configs
+import ingest_journal
+import manage_docs
+import passage_index
+import upload_docs
+from fake_gemini import FakeGeminiClient
+from streamlit_ui import helpers
+from streamlit_ui.memory import current_rss_bytes, measure_session
+
+APP_PATH = str(Path(__file__).parent / "streamlit_ui" / "streamlit_app.py")
+DOC_PREFIX = "loadtest-"
+# On-disk locations the app writes to, relative to the run's temporary directory.
+STORAGE_PATHS = {
+    "DOCS_DIR": "docs",
+    "INGEST_JOURNAL_PATH": os.path.join("ingest", "journal.sqlite3"),
+    "PASSAGE_INDEX_DIR": "passages",
+    "PENDING_SPILL_DIR": "pending",
+}
+PROMPTS = [
+    "What are the stages of the roadmap?",
+    "Summarize the main risks mentioned in the documents.",
+    "Who owns the launch stage?",
+    "List the deliverables for the design phase.",
+]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--users", type=int, default=10, help="simulated concurrent users"
+    )
+    parser.add_argument("--turns", type=int, default=3, help="chat turns per user")
+    parser.add_argument(
+        "--docs", type=int, default=2, help="documents indexed per user"
+    )
+    parser.add_argument("--doc-kb", type=int, default=16, help="size of each document")
+    parser.add_argument(
+        "--think-min", type=float, default=0.5, help="min think time (s)"
+    )
+    parser.add_argument(
+        "--think-max", type=float, default=2.0, help="max think time (s)"
+    )
+    parser.add_argument(
+        "--ramp-up", type=float, default=1.0, help="seconds to start all users"
+    )
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--index-latency", type=float, default=0.5)
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="per-rerun timeout (s)"
+    )
+    parser.add_argument("--json", metavar="PATH", help="also write raw results as JSON")
+    return parser.parse_args()
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty sample."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _isolate_storage(root: str) -> None:
+    """Point every on-disk location the app uses into root.
+
+    Modules bind these settings at import time (``from configs import ...``),
+    so each module holding one is patched, not just configs.
+    """
+    for module in (
+        configs,
+        ingest_journal,
+        manage_docs,
+        passage_index,
+        upload_docs,
+        helpers,
+    ):
+        for name, relative in STORAGE_PATHS.items():
+            if hasattr(module, name):
+                setattr(module, name, os.path.join(root, relative))
+    os.makedirs(os.path.join(root, STORAGE_PATHS["DOCS_DIR"]))
+
+
+@contextmanager
+def _shared_app_test_runtime() -> Iterator[None]:
+    """Let concurrent AppTest runs share one mock runtime while the block runs.
+
+    AppTest installs a fresh mock Runtime singleton for each run and clears it
+    when the run ends, which breaks every other user's run still in flight.
+    The mocks are interchangeable, so keep serving the most recent one.
+
+    This relies on Streamlit internals — the private ``Runtime._instance``
+    singleton behind ``Runtime.instance`` — and may need updating when
+    Streamlit changes them. The original ``Runtime.instance`` is restored on
+    exit.
+    """
+    original = Runtime.__dict__["instance"]
+    last: dict[str, Runtime] = {}
+
+    def instance(cls) -> Runtime:
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        runtime = cls._instance or last.get("runtime")
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime
+
+    Runtime.instance = classmethod(instance)
+    try:
+        yield
+    finally:
+        Runtime.instance = original
+
+
+class _UserStats:
+    def __init__(self) -> None:
+        self.reruns: list[float] = []
+        self.ttft: list[float] = []
+        self.turn_seconds: list[float] = []
+        self.index_seconds: float | None = None
+        self.errors: list[str] = []
+        self.state_bytes: int = 0
+
+
+def _run(at: AppTest, stats: _UserStats) -> None:
+    """Rerun the app once, timing it and collecting any script exceptions."""
+    started = time.perf_counter()
+    at.run()
+    stats.reruns.append(time.perf_counter() - started)
+    stats.errors.extend(e.message for e in at.exception)
+
+
+def _simulate_user(user: int, args: argparse.Namespace) -> _UserStats:
+    """Index documents and chat as one user; returns that user's measurements."""
+    stats = _UserStats()
+    rng = random.Random(user)
+    fake = FakeGeminiClient(
+        first_token_latency=args.first_token_latency,
+        token_interval=args.token_interval,
+        response_tokens=args.response_tokens,
+        index_latency=args.index_latency,
+    )
+    at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    # A key per user, so each user owns only its own upload jobs.
+    at.session_state["api_key"] = f"fake-key-{user}"
+    at.session_state["gemini_client"] = fake
+
+    try:
+        _run(at, stats)
+
+        # AppTest cannot drive st.file_uploader, so stage entries directly in
+        # the shape the picker produces. Names are unique per user because
+        # every session shares the run's DOCS_DIR.
+        body = (f"Document for user {user}. " * (args.doc_kb * 40))[
+            : args.doc_kb * 1024
+        ]
+        data = body.encode()
+        at.session_state["pending_files"] = {
+            f"{DOC_PREFIX}u{user}-d{d}.txt": {
+                "size": len(data),
+                "data": data,
+                "path": None,
+            }
+            for d in range(args.docs)
+        }
+        _run(at, stats)
+
+        started = time.perf_counter()
+        next(b for b in at.sidebar.button if b.label == "Upload & Index").click()
+        _run(at, stats)
+        while at.session_state["store"] is None:
+            if stats.errors or time.perf_counter() - started > args.timeout:
+                stats.errors.append("indexing did not complete")
+                return stats
+            time.sleep(0.5)
+            _run(at, stats)
+        stats.index_seconds = time.perf_counter() - started
+
+        for _ in range(args.turns):
+            time.sleep(rng.uniform(args.think_min, args.think_max))
+            responses_before = len(fake.first_token_times)
+            at.chat_input[0].set_value(rng.choice(PROMPTS))
+            started = time.perf_counter()
+            _run(at, stats)
+            stats.turn_seconds.append(time.perf_counter() - started)
+            if len(fake.first_token_times) > responses_before:
+                stats.ttft.append(fake.first_token_times[responses_before] - started)
+        usage = measure_session(at.session_state)
+        stats.state_bytes = (
+            usage["messages"] + usage["pending_in_memory"] + usage["citations"]
+        )
+    except Exception as e:
+        stats.errors.append(f"{type(e).__name__}: {e}")
+    return stats
+
+
+def _summary(line: str, values: list[float]) -> str:
+    return (
+        f"{line:<18} n={len(values):<5} "
+        f"p50={_percentile(values, 50) * 1000:7.0f}ms "
+        f"p90={_percentile(values, 90) * 1000:7.0f}ms "
+        f"p99={_percentile(values, 99) * 1000:7.0f}ms "
+        f"max={max(values, default=0) * 1000:7.0f}ms"
+    )
+
+
+def _load_test(args: argparse.Namespace) -> None:
+    """Run every simulated user and print (and optionally save) the results."""
+    # Harness threads touch AppTest session state outside a script run.
+    logging.getLogger(
+        "streamlit.runtime.scriptrunner_utils.script_run_context"
+    ).addFilter(lambda record: "missing ScriptRunContext" not in record.getMessage())
+    rss_before = current_rss_bytes()
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+
+    stagger = args.ramp_up / args.users if args.users else 0.0
+    results: list[_UserStats] = []
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = []
+        for user in range(args.users):
+            futures.append(pool.submit(_simulate_user, user, args))
+            time.sleep(stagger)
+        results = [f.result() for f in futures]
+
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    rss_growth = current_rss_bytes() - rss_before
+    state_bytes = [s.state_bytes for s in results]
+
+    reruns = [r for s in results for r in s.reruns]
+    ttft = [t for s in results for t in s.ttft]
+    turns = [t for s in results for t in s.turn_seconds]
+    indexing = [s.index_seconds for s in results if s.index_seconds is not None]
+    errors = [e for s in results for e in s.errors]
+    users = max(args.users, 1)
+
+    print(f"Users: {args.users}  turns/user: {args.turns}  wall: {wall:.1f}s")
+    print(
+        f"Throughput: {len(turns) / wall:.2f} chat turns/s, {len(reruns) / wall:.2f} reruns/s"
+    )
+    print(_summary("TTFT", ttft))
+    print(_summary("Chat turn", turns))
+    print(_summary("Rerun", reruns))
+    print(_summary("Indexing", indexing))
+    print(f"CPU per session: {cpu / users:.2f}s (process total {cpu:.1f}s)")
+    print(f"RSS growth per session: {rss_growth / users / 1024:.0f} KB")
+    print(
+        f"Session state per session: avg {sum(state_bytes) / users / 1024:.1f} KB, "
+        f"max {max(state_bytes, default=0) / 1024:.1f} KB"
+    )
+    if errors:
+        print(f"Errors ({len(errors)}):")
+        for error in sorted(set(errors)):
+            print(f"  - {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "args": vars(args),
+                    "wall_seconds": wall,
+                    "cpu_seconds": cpu,
+                    "rss_growth_bytes": rss_growth,
+                    "session_state_bytes": state_bytes,
+                    "ttft_seconds": ttft,
+                    "turn_seconds": turns,
+                    "rerun_seconds": reruns,
+                    "index_seconds": indexing,
+                    "errors": errors,
+                },
+                f,
+                indent=2,
+            )
+
+
+def main() -> None:
+    args = _parse_args()
+    # Run against throwaway storage so the journal, passage index, and staged
+    # files of a real deployment in the same directory are never touched.
+    with tempfile.TemporaryDirectory(prefix=DOC_PREFIX) as root:
+        _isolate_storage(root)
+        with _shared_app_test_runtime():
+            _load_test(args)
+
+
+if __name__ == "__main__":
+    main()
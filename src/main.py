@@ -1,24 +1,49 @@
-from configs import TEST_PROMPT
+from configs import EXTENDED_CITATIONS, TEST_PROMPT
 from manage_docs import select_and_copy_files, cleanup_docs
-from upload_docs import upload_docs
+from upload_docs import resumable_jobs, run_upload_job, upload_docs
+from ingest_journal import abandon_job, unfinished_jobs
 from query_docs import generate_response
 from check_docs import check_docs
-from citate_docs import cite_documents
+from citate_docs import cite_documents, cite_passages
 
 from gemini_client import client
 
 
+def _prompt_resume() -> str | None:
+    """Offer to resume each of this API key's interrupted upload jobs, oldest first.
+
+    Returns the id of the first job the user accepts. Declined jobs are
+    abandoned so they are not offered again and no longer hold back cleanup.
+    """
+    for job in resumable_jobs():
+        answer = input(
+            f"Found an interrupted upload job ({job.indexed}/{job.total} indexed). "
+            "Resume it? [Y/n]: "
+        )
+        if answer.strip().lower() in ("", "y", "yes"):
+            return job.job_id
+        abandon_job(job.job_id)
+        print("Discarded the interrupted job.")
+    return None
+
+
 def main():
     try:
-        print("step 0: select documents")
-        copied = select_and_copy_files()
-        if copied:
-            print(f"Added {len(copied)} file(s) to docs/: {', '.join(copied)}")
+        resume_job_id = _prompt_resume()
+
+        if resume_job_id:
+            print("\nstep 1: resume upload")
+            store = run_upload_job(resume_job_id)
         else:
-            print("No new files selected — using existing docs/ contents.")
+            print("step 0: select documents")
+            copied = select_and_copy_files()
+            if copied:
+                print(f"Added {len(copied)} file(s) to docs/: {', '.join(copied)}")
+            else:
+                print("No new files selected — using existing docs/ contents.")
 
-        print("\nstep 1: upload docs")
-        store = upload_docs(copied if copied else None)
+            print("\nstep 1: upload docs")
+            store = upload_docs(copied if copied else None)
 
         print("\nstep 2: check docs")
         for name in check_docs(store):
@@ -33,15 +58,24 @@ def main():
             last_chunk = chunk
         print()
         print("\nCitations:")
-        citations = cite_documents(
+        candidate = (
             last_chunk.candidates[0] if last_chunk and last_chunk.candidates else None
         )
+        citations = (
+            cite_passages(candidate, store.name or "")
+            if EXTENDED_CITATIONS
+            else cite_documents(candidate)
+        )
         print(citations)
     except KeyboardInterrupt:
         print("\nInterrupted by user.")
     finally:
-        print("\nstep 4: cleanup docs")
-        cleanup_docs()
+        if any(job.source_dir is None for job in unfinished_jobs()):
+            # Keep the staged files: an interrupted job still needs them.
+            print("\nstep 4: cleanup skipped — run again to resume the upload job.")
+        else:
+            print("\nstep 4: cleanup docs")
+            cleanup_docs()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,308 @@
+"""
+Local passage index for extended citations.
+
+At upload time each staged text document is tokenized into a small inverted
+index (token → token positions) and saved, content-addressed, under
+PASSAGE_INDEX_DIR together with its text. A per-store manifest maps the
+display names Gemini reports as citation titles to those content hashes.
+`locate_passage` then finds a grounding chunk's quoted text inside its
+source document and returns character offsets and a snippet.
+
+PDFs are not indexed: extracting their text would need a PDF parser, which
+is not a dependency of this project.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from configs import (
+    PASSAGE_CACHE_SIZE,
+    PASSAGE_DOC_CACHE_BYTES,
+    PASSAGE_INDEX_DIR,
+    PASSAGE_SNIPPET_CONTEXT,
+)
+
+_TOKEN_RE = re.compile(r"\w+")
+_TEXT_EXTENSIONS = {".txt", ".md", ".csv", ".xml"}
+_HTML_EXTENSIONS = {".html", ".htm"}
+
+# Alignment tuning: candidate starts come from the rarest chunk tokens, and a
+# match must cover at least half of the chunk's tokens.
+_MAX_ANCHORS = 3
+_MAX_CANDIDATES = 2000
+_MIN_MATCH_RATIO = 0.5
+
+# Approximate heap cost of one token of a loaded document: its span pair, its
+# lowercase token string, and its postings entry (measured on CPython 3.10).
+_TOKEN_HEAP_BYTES = 260
+
+# Located passages keyed by (content hash, chunk hash); None records a miss.
+_passage_cache: OrderedDict[tuple[str, str], "Passage | None"] = OrderedDict()
+# Loaded documents keyed by content hash, with their estimated heap size in bytes.
+_document_cache: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+_document_cache_bytes = 0
+_cache_lock = threading.Lock()
+# Serializes manifest read-modify-writes from concurrent upload workers.
+_manifest_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Passage:
+    """A grounding chunk located in its source document.
+
+    ``start`` and ``end`` are character offsets into the indexed text (the
+    file itself for plain-text formats, the extracted text for HTML).
+    """
+
+    start: int
+    end: int
+    before: str
+    match: str
+    after: str
+
+
+class _HTMLText(HTMLParser):
+    """Collect the visible text of an HTML document."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag) -> None:
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data) -> None:
+        if not self._skip:
+            self.parts.append(data)
+
+
+def extract_text(data: bytes, filename: str) -> str | None:
+    """Return the indexable text of a document, or None for unsupported formats."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in _TEXT_EXTENSIONS:
+        return data.decode("utf-8", errors="replace")
+    if ext in _HTML_EXTENSIONS:
+        parser = _HTMLText()
+        parser.feed(data.decode("utf-8", errors="replace"))
+        return "".join(parser.parts)
+    return None
+
+
+def build_index(text: str) -> dict:
+    """Tokenize text into token spans and an inverted index of token positions."""
+    spans: list[list[int]] = []
+    postings: dict[str, list[int]] = {}
+    for position, match in enumerate(_TOKEN_RE.finditer(text)):
+        spans.append([match.start(), match.end()])
+        postings.setdefault(match.group().lower(), []).append(position)
+    return {"text": text, "spans": spans, "postings": postings}
+
+
+def content_hash(data: bytes) -> str:
+    """Return the content address (SHA-256 hex digest) of a document's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def index_path(digest: str) -> str:
+    """Return where the index for the given content hash is stored."""
+    return os.path.join(PASSAGE_INDEX_DIR, "docs", f"{digest}.json")
+
+
+def _manifest_path(store_name: str) -> str:
+    safe_name = re.sub(r"[^\w.-]", "_", store_name)
+    return os.path.join(PASSAGE_INDEX_DIR, "stores", f"{safe_name}.json")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write a file atomically so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path: str, payload) -> None:
+    _write_atomic(path, json.dumps(payload).encode("utf-8"))
+
+
+@lru_cache(maxsize=64)
+def _read_manifest(path: str, mtime_ns: int) -> dict[str, str]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_manifest(store_name: str) -> dict[str, str]:
+    """Return the {display name: content hash} manifest for a store (empty if none).
+
+    Parsed manifests are cached until the file changes on disk.
+    """
+    path = _manifest_path(store_name)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    return dict(_read_manifest(path, mtime_ns))
+
+
+def record_documents(store_name: str, documents: dict[str, str]) -> None:
+    """Add {display name: content hash} entries to a store's manifest."""
+    with _manifest_lock:
+        manifest = load_manifest(store_name)
+        manifest.update(documents)
+        _write_json(_manifest_path(store_name), manifest)
+
+
+def ensure_index(digest: str, data: bytes, filename: str) -> bool:
+    """Index a document's bytes unless that content is already indexed.
+
+    Returns False when the format is not indexable.
+    """
+    if os.path.exists(index_path(digest)):
+        return True
+    text = extract_text(data, filename)
+    if text is None:
+        return False
+    _write_json(index_path(digest), build_index(text))
+    return True
+
+
+def restore_index(digest: str, payload: bytes) -> None:
+    """Install a serialized index (e.g. from a snapshot) as-is, without re-tokenizing."""
+    if not os.path.exists(index_path(digest)):
+        _write_atomic(index_path(digest), payload)
+
+
+def _load_document(digest: str) -> dict | None:
+    """Load an indexed document and materialize its lowercase token list.
+
+    Loaded documents are kept in an LRU cache bounded to PASSAGE_DOC_CACHE_BYTES
+    of estimated heap size. Missing indexes are not cached, so a document
+    indexed later is picked up on the next lookup.
+    """
+    global _document_cache_bytes
+    with _cache_lock:
+        if digest in _document_cache:
+            _document_cache.move_to_end(digest)
+            return _document_cache[digest][0]
+
+    try:
+        with open(index_path(digest), encoding="utf-8") as f:
+            doc = json.load(f)
+    except FileNotFoundError:
+        return None
+    text = doc["text"]
+    doc["tokens"] = [text[start:end].lower() for start, end in doc["spans"]]
+    size = sys.getsizeof(text) + len(doc["spans"]) * _TOKEN_HEAP_BYTES
+
+    if size <= PASSAGE_DOC_CACHE_BYTES:
+        with _cache_lock:
+            if digest not in _document_cache:
+                _document_cache[digest] = (doc, size)
+                _document_cache_bytes += size
+            while _document_cache_bytes > PASSAGE_DOC_CACHE_BYTES:
+                _evicted, (_doc, evicted_size) = _document_cache.popitem(last=False)
+                _document_cache_bytes -= evicted_size
+    return doc
+
+
+def _align(doc: dict, chunk_tokens: list[str]) -> tuple[int, int] | None:
+    """Return the first and last document token positions best matching the chunk."""
+    postings = doc["postings"]
+    present = sorted(
+        (len(postings[token]), offset, token)
+        for offset, token in enumerate(chunk_tokens)
+        if token in postings
+    )
+    if not present:
+        return None
+
+    starts: set[int] = set()
+    for _count, offset, token in present[:_MAX_ANCHORS]:
+        starts.update(position - offset for position in postings[token])
+    tokens = doc["tokens"]
+
+    best: list[int] = []
+    for start in sorted(starts)[:_MAX_CANDIDATES]:
+        matched = [
+            start + i
+            for i, token in enumerate(chunk_tokens)
+            if 0 <= start + i < len(tokens) and tokens[start + i] == token
+        ]
+        if len(matched) > len(best):
+            best = matched
+
+    if len(best) < _MIN_MATCH_RATIO * len(chunk_tokens):
+        return None
+    return best[0], best[-1]
+
+
+def _locate(doc: dict, chunk_text: str) -> Passage | None:
+    chunk_tokens = [t.lower() for t in _TOKEN_RE.findall(chunk_text)]
+    if not chunk_tokens:
+        return None
+    aligned = _align(doc, chunk_tokens)
+    if aligned is None:
+        return None
+
+    text = doc["text"]
+    start = doc["spans"][aligned[0]][0]
+    end = doc["spans"][aligned[1]][1]
+    return Passage(
+        start=start,
+        end=end,
+        before=text[max(0, start - PASSAGE_SNIPPET_CONTEXT) : start],
+        match=text[start:end],
+        after=text[end : end + PASSAGE_SNIPPET_CONTEXT],
+    )
+
+
+def locate_passage(store_name: str, title: str, chunk_text: str) -> Passage | None:
+    """
+    Locate a grounding chunk's text inside the cited document of a store.
+
+    Results (including chunks not found in the document) are cached per
+    (document content, chunk hash), so repeated citations of the same passage
+    skip the search entirely. A missing index is not cached.
+
+    Args:
+        store_name: The file search store the answer was grounded in.
+        title: The citation title, i.e. the document's display name.
+        chunk_text: The retrieved chunk text from the grounding metadata.
+    """
+    digest = load_manifest(store_name).get(title)
+    if digest is None:
+        return None
+
+    key = (digest, hashlib.sha1(chunk_text.encode("utf-8")).hexdigest())
+    with _cache_lock:
+        if key in _passage_cache:
+            _passage_cache.move_to_end(key)
+            return _passage_cache[key]
+
+    doc = _load_document(digest)
+    if doc is None:
+        return None
+    passage = _locate(doc, chunk_text)
+
+    with _cache_lock:
+        _passage_cache[key] = passage
+        if len(_passage_cache) > PASSAGE_CACHE_SIZE:
+            _passage_cache.popitem(last=False)
+    return passage
@@ -0,0 +1,318 @@
+"""
+Store snapshots: export a file search store to a compact archive and import
+it into another environment.
+
+A snapshot is a gzip-compressed tar whose first member is the manifest:
+
+    manifest.json        {"version", "created_at", "documents": [
+                             {"name", "sha256", "size", "indexed"}, ...]}
+    files/<sha256>       original document bytes, stored once per distinct content
+    index/<sha256>.json  passage index (normalized text, token spans, postings)
+
+Import streams the archive once. It uploads only content the target store
+does not already hold, in parallel through the resumable upload journal, and
+installs the passage indexes as-is so nothing is re-tokenized.
+
+Run from the project root:
+  uv run python src/snapshot.py export fileSearchStores/abc123 snapshot.tar.gz
+  uv run python src/snapshot.py import snapshot.tar.gz [--store fileSearchStores/xyz]
+  uv run python src/snapshot.py resume
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+
+from google.genai.types import FileSearchStore
+
+import ingest_journal
+from check_docs import check_doc_hashes, check_docs
+from configs import DOCS_DIR, SNAPSHOT_STAGING_DIR, SNAPSHOT_UPLOAD_WORKERS
+from gemini_client import client as _default_client
+from gemini_client import client_fingerprint as _default_owner
+from passage_index import (
+    content_hash,
+    ensure_index,
+    index_path,
+    load_manifest,
+    record_documents,
+    restore_index,
+)
+from upload_docs import create_store, resumable_jobs, run_upload_job
+
+SNAPSHOT_VERSION = 1
+_MANIFEST = "manifest.json"
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def export_snapshot(
+    store_name: str,
+    archive_path: str,
+    source_dir: str = DOCS_DIR,
+    client=None,
+) -> int:
+    """
+    Write a snapshot of a store's documents and passage indexes to archive_path.
+
+    Document bytes are read from source_dir (the staging directory by default),
+    since the File Search API does not return uploaded content. Documents whose
+    source file is missing, or differs from the content recorded for the store,
+    are skipped with a warning. Returns the number of documents exported.
+
+    Args:
+        store_name: Resource name of the store to export (e.g. "fileSearchStores/abc").
+        archive_path: Where to write the .tar.gz snapshot.
+        source_dir: Directory holding the store's original files.
+        client: Optional Gemini client. Defaults to the module-level singleton.
+    """
+    _client = client if client is not None else _default_client
+    if _client is None:
+        raise ValueError(
+            "No Gemini client available. Set the GEMINI_API_KEY environment variable."
+        )
+    store = _client.file_search_stores.get(name=store_name)
+    expected = {**load_manifest(store_name), **check_doc_hashes(store, client=_client)}
+
+    # First pass: hash and index every document so the manifest can lead the
+    # archive and import can stream it in one go.
+    documents: list[dict] = []
+    paths: dict[str, str] = {}
+    for name in check_docs(store, client=_client):
+        path = os.path.join(source_dir, name)
+        if not os.path.isfile(path):
+            print(f"Skipping {name}: not found in {source_dir}")
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = content_hash(data)
+        if expected.get(name, digest) != digest:
+            print(f"Skipping {name}: local copy differs from the indexed content")
+            continue
+        documents.append(
+            {
+                "name": name,
+                "sha256": digest,
+                "size": len(data),
+                "indexed": ensure_index(digest, data, name),
+            }
+        )
+        paths.setdefault(digest, path)
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "documents": documents,
+    }
+    with tarfile.open(archive_path, "w:gz") as tar:
+        _add_member(tar, _MANIFEST, json.dumps(manifest).encode("utf-8"))
+        for digest, path in paths.items():
+            tar.add(path, arcname=f"files/{digest}")
+            if os.path.exists(index_path(digest)):
+                tar.add(index_path(digest), arcname=f"index/{digest}.json")
+
+    print(f"Exported {len(documents)} document(s) to {archive_path}")
+    return len(documents)
+
+
+def _finish_import(
+    job_id: str, staging_dir: str, max_workers: int, client
+) -> FileSearchStore:
+    """Run an import's upload job; remove its staging directory if nothing failed."""
+    store = run_upload_job(job_id, client=client, max_workers=max_workers)
+    progress = ingest_journal.get_progress(job_id)
+    if progress and progress.failed:
+        print(f"{progress.failed} file(s) failed; staged copies kept in {staging_dir}")
+    else:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return store
+
+
+def import_snapshot(
+    archive_path: str,
+    store_name: str | None = None,
+    max_workers: int = SNAPSHOT_UPLOAD_WORKERS,
+    client=None,
+    owner: str | None = None,
+) -> FileSearchStore:
+    """
+    Load a snapshot into a store, uploading only content it does not already hold.
+
+    Content counts as held when the store reports its hash. A document whose
+    name is in the store with different content is uploaded with a warning.
+    Files to upload are staged in a directory of their own under
+    SNAPSHOT_STAGING_DIR, never in DOCS_DIR, and uploaded through a journaled
+    job; an interrupted import is continued with `resume_imports`. Passage
+    indexes are installed directly, so extended citations work without
+    re-tokenizing.
+
+    Args:
+        archive_path: Snapshot written by `export_snapshot`.
+        store_name: Existing store to import into. A new store is created if None.
+        max_workers: Number of concurrent uploads.
+        client: Optional Gemini client. Defaults to the module-level singleton.
+        owner: Fingerprint of the client's API key. Defaults to GEMINI_API_KEY's.
+    """
+    _client = client if client is not None else _default_client
+    if _client is None:
+        raise ValueError(
+            "No Gemini client available. Set the GEMINI_API_KEY environment variable."
+        )
+    _owner = owner if owner is not None else _default_owner
+    store = (
+        _client.file_search_stores.get(name=store_name)
+        if store_name
+        else create_store(client=_client)
+    )
+    present = set(check_doc_hashes(store, client=_client).values())
+    present_names = set(check_docs(store, client=_client))
+
+    os.makedirs(SNAPSHOT_STAGING_DIR, exist_ok=True)
+    staging_dir = os.path.abspath(
+        tempfile.mkdtemp(prefix="import-", dir=SNAPSHOT_STAGING_DIR)
+    )
+    staged: list[str] = []
+    try:
+        with tarfile.open(archive_path, "r|gz") as tar:
+            members = iter(tar)
+            first = next(members, None)
+            if first is None or first.name != _MANIFEST:
+                raise ValueError(f"{archive_path} is not a snapshot archive.")
+            manifest = json.load(tar.extractfile(first))
+            if manifest.get("version") != SNAPSHOT_VERSION:
+                version = manifest.get("version")
+                raise ValueError(f"Unsupported snapshot version: {version}")
+
+            documents = [
+                {**doc, "name": os.path.basename(doc["name"])}
+                for doc in manifest["documents"]
+                if _DIGEST_RE.fullmatch(doc["sha256"]) and os.path.basename(doc["name"])
+            ]
+            wanted: dict[str, list[str]] = {}
+            for doc in documents:
+                name = doc["name"]
+                if doc["sha256"] in present:
+                    print(f"Already in store: {name}")
+                    continue
+                if name in present_names:
+                    print(f"Uploading {name}: the store has a different version")
+                wanted.setdefault(doc["sha256"], []).append(name)
+
+            for member in members:
+                kind, _, ref = member.name.partition("/")
+                if kind == "files" and ref in wanted:
+                    data = tar.extractfile(member).read()
+                    if content_hash(data) != ref:
+                        raise ValueError(f"Corrupt snapshot: {ref} does not match")
+                    for name in wanted[ref]:
+                        if name in staged:
+                            print(f"Skipping {name}: duplicate name in the snapshot")
+                            continue
+                        with open(os.path.join(staging_dir, name), "wb") as f:
+                            f.write(data)
+                        staged.append(name)
+                elif kind == "index" and ref.endswith(".json"):
+                    digest = ref[: -len(".json")]
+                    if _DIGEST_RE.fullmatch(digest):
+                        restore_index(digest, tar.extractfile(member).read())
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    # Staged files are recorded as they are indexed; record content the store holds.
+    record_documents(
+        store.name,
+        {
+            doc["name"]: doc["sha256"]
+            for doc in documents
+            if doc["sha256"] in present and os.path.exists(index_path(doc["sha256"]))
+        },
+    )
+
+    if not staged:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return store
+    job_id = ingest_journal.create_job(
+        store.name, staged, owner=_owner, source_dir=staging_dir
+    )
+    return _finish_import(job_id, staging_dir, max_workers, _client)
+
+
+def resume_imports(
+    max_workers: int = SNAPSHOT_UPLOAD_WORKERS, client=None, owner: str | None = None
+) -> list[FileSearchStore]:
+    """
+    Continue every interrupted snapshot import owned by the API key, oldest first.
+
+    Args:
+        max_workers: Number of concurrent uploads.
+        client: Optional Gemini client. Defaults to the module-level singleton.
+        owner: Fingerprint of the client's API key. Defaults to GEMINI_API_KEY's.
+    """
+    _client = client if client is not None else _default_client
+    if _client is None:
+        raise ValueError(
+            "No Gemini client available. Set the GEMINI_API_KEY environment variable."
+        )
+    return [
+        _finish_import(job.job_id, job.source_dir, max_workers, _client)
+        for job in resumable_jobs(owner, snapshots=True)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import store snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="write a store snapshot")
+    export_cmd.add_argument(
+        "store", help='store resource name, e.g. "fileSearchStores/abc"'
+    )
+    export_cmd.add_argument("archive", help="output .tar.gz path")
+    export_cmd.add_argument("--source-dir", default=DOCS_DIR, help="original files")
+
+    import_cmd = commands.add_parser("import", help="load a snapshot into a store")
+    import_cmd.add_argument("archive", help="snapshot .tar.gz path")
+    import_cmd.add_argument("--store", help="existing store to import into")
+    import_cmd.add_argument("--workers", type=int, default=SNAPSHOT_UPLOAD_WORKERS)
+
+    resume_cmd = commands.add_parser("resume", help="continue interrupted imports")
+    resume_cmd.add_argument("--workers", type=int, default=SNAPSHOT_UPLOAD_WORKERS)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_snapshot(args.store, args.archive, source_dir=args.source_dir)
+        return
+
+    try:
+        if args.command == "resume":
+            stores = resume_imports(max_workers=args.workers)
+        else:
+            stores = [
+                import_snapshot(
+                    args.archive, store_name=args.store, max_workers=args.workers
+                )
+            ]
+    except KeyboardInterrupt:
+        print("\nInterrupted — run `snapshot.py resume` to continue the import.")
+        return
+    if not stores:
+        print("No interrupted imports to resume.")
+    for store in stores:
+        print(f"Imported into {store.name}")
+
+
+if __name__ == "__main__":
+    main()
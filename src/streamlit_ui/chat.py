@@ -5,6 +5,7 @@ import streamlit as st
 from citate_docs import cite_documents
 
 from .helpers import streaming_wrapper
+from .state import append_message
 
 
 def _render_header() -> None:
@@ -17,6 +18,11 @@ def _render_header() -> None:
 
 def _render_message_history() -> None:
     """Render all previous messages with their associated citations."""
+    if st.session_state.messages_trimmed:
+        st.caption(
+            f":material/history: {st.session_state.messages_trimmed} earlier "
+            "message(s) were dropped to bound session memory."
+        )
     for msg in st.session_state.messages:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
@@ -30,7 +36,7 @@ def _handle_query_input() -> None:
     if not (user_prompt := st.chat_input("Ask about your documents…")):
         return
 
-    st.session_state.messages.append({"role": "user", "content": user_prompt})
+    append_message({"role": "user", "content": user_prompt})
 
     with st.chat_message("user"):
         st.markdown(user_prompt)
@@ -43,22 +49,16 @@ def _handle_query_input() -> None:
         except Exception as e:
             error_msg = f"An error occurred while generating a response: {e}"
             st.error(error_msg)
-            st.session_state.messages.append(
-                {"role": "assistant", "content": error_msg, "citations": ""}
-            )
+            append_message({"role": "assistant", "content": error_msg, "citations": ""})
             return
 
-    last_chunk = st.session_state.pop("_last_chunk", None)
-    candidate = (
-        last_chunk.candidates[0] if last_chunk and last_chunk.candidates else None
-    )
-    citations = cite_documents(candidate)
+    citations = st.session_state.pop("_last_citations", None) or cite_documents(None)
 
     with st.chat_message("assistant"):
         with st.expander(":material/format_quote: Citations"):
             st.markdown(citations)
 
-    st.session_state.messages.append(
+    append_message(
         {
             "role": "assistant",
             "content": response_text,
@@ -1,13 +1,23 @@
 """Utility functions and computed configuration for the Streamlit UI."""
 
 import os
+import shutil
+import tempfile
 from typing import Generator
 
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 from google.genai.types import FileSearchStore
 
-from configs import DOCS_DIR, SUPPORTED_FILETYPES
+from citate_docs import cite_documents, cite_passages
+from configs import (
+    DOCS_DIR,
+    PENDING_MEMORY_LIMIT_BYTES,
+    PENDING_SPILL_DIR,
+    SUPPORTED_FILETYPES,
+)
 from query_docs import generate_response
 
 # ── Supported extensions for Streamlit's file_uploader ─────────────────────
@@ -19,15 +29,125 @@ EXTENSIONS: list[str] = [
 ]
 
 
-def save_uploaded_files(uploaded_files: list[UploadedFile]) -> list[str]:
-    """Write Streamlit UploadedFile objects to DOCS_DIR and return basenames."""
+def _boot_id() -> str:
+    """Return the kernel's boot id, or "" where it is not available (non-Linux)."""
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+# Spill files live under a root owned by this process, so several Streamlit
+# workers can share PENDING_SPILL_DIR without touching each other's files.
+_BOOT_ID = _boot_id()
+_PROCESS_SPILL_NAME = f"{_BOOT_ID or 'boot'}-{os.getpid()}"
+_dead_roots_removed = False
+
+
+def _process_spill_root() -> str:
+    return os.path.join(PENDING_SPILL_DIR, _PROCESS_SPILL_NAME)
+
+
+def _session_spill_dir() -> str:
+    """Return the current session's spill directory under this process's root."""
+    ctx = get_script_run_ctx()
+    return os.path.join(_process_spill_root(), ctx.session_id if ctx else "default")
+
+
+def _process_is_gone(root_name: str) -> bool:
+    """True if a spill root belongs to a process that has exited.
+
+    Only decidable on Linux: the root is gone if it was made before the last
+    reboot or its pid no longer runs. Elsewhere roots are never judged gone.
+    """
+    boot_id, _, pid = root_name.rpartition("-")
+    if not _BOOT_ID or not pid.isdigit():
+        return False
+    if boot_id != _BOOT_ID:
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def sweep_spill_dirs() -> None:
+    """Delete the spill directories of this process's ended sessions.
+
+    The first sweep of a process also removes the roots of exited processes.
+    """
+    global _dead_roots_removed
+    if not _dead_roots_removed and os.path.isdir(PENDING_SPILL_DIR):
+        _dead_roots_removed = True
+        for root_name in os.listdir(PENDING_SPILL_DIR):
+            if root_name != _PROCESS_SPILL_NAME and _process_is_gone(root_name):
+                shutil.rmtree(
+                    os.path.join(PENDING_SPILL_DIR, root_name), ignore_errors=True
+                )
+
+    root = _process_spill_root()
+    if not Runtime.exists() or not os.path.isdir(root):
+        return
+    runtime = Runtime.instance()
+    for session_id in os.listdir(root):
+        if not runtime.is_active_session(session_id):
+            shutil.rmtree(os.path.join(root, session_id), ignore_errors=True)
+
+
+def stage_pending_file(uploaded_file: UploadedFile, pending: dict[str, dict]) -> dict:
+    """
+    Copy an UploadedFile into a pending-file entry, detached from the widget.
+
+    Entries are ``{"size": int, "data": bytes | None, "path": str | None}``.
+    Bytes stay in memory while the session's in-memory pending total is under
+    PENDING_MEMORY_LIMIT_BYTES; beyond that the file is spilled to a
+    per-session directory under this process's spill root and only its path
+    is kept. Directories left by ended sessions are swept on the way.
+    """
+    in_memory = sum(len(e["data"]) for e in pending.values() if e["data"] is not None)
+    if in_memory + uploaded_file.size <= PENDING_MEMORY_LIMIT_BYTES:
+        return {
+            "size": uploaded_file.size,
+            "data": uploaded_file.getvalue(),
+            "path": None,
+        }
+
+    sweep_spill_dirs()
+    spill_dir = _session_spill_dir()
+    os.makedirs(spill_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=spill_dir)
+    uploaded_file.seek(0)
+    with os.fdopen(fd, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f)
+    return {"size": uploaded_file.size, "data": None, "path": path}
+
+
+def discard_pending_file(entry: dict) -> None:
+    """Delete a pending entry's spill file, if it has one."""
+    if entry["path"] and os.path.isfile(entry["path"]):
+        os.remove(entry["path"])
+
+
+def save_pending_files(pending: dict[str, dict]) -> list[str]:
+    """Write pending entries to DOCS_DIR and return basenames.
+
+    Spilled entries are moved rather than copied, so no bytes are re-read
+    into memory.
+    """
     os.makedirs(DOCS_DIR, exist_ok=True)
     saved: list[str] = []
-    for uf in uploaded_files:
-        dest = os.path.join(DOCS_DIR, uf.name)
-        with open(dest, "wb") as f:
-            f.write(uf.read())
-        saved.append(uf.name)
+    for name, entry in pending.items():
+        dest = os.path.join(DOCS_DIR, name)
+        if entry["data"] is not None:
+            with open(dest, "wb") as f:
+                f.write(entry["data"])
+        else:
+            shutil.move(entry["path"], dest)
+        saved.append(name)
     return saved
 
 
@@ -36,7 +156,8 @@ def streaming_wrapper(
 ) -> Generator[str, None, None]:
     """
     Wrap generate_response so st.write_stream receives plain strings
-    while we capture the final raw chunk for citation extraction.
+    while we extract citations from the final chunk. In extended mode the
+    citations also quote the located passages.
 
     Uses the per-session Gemini client stored in st.session_state so that
     the Streamlit app uses the user-provided API key rather than the
@@ -49,5 +170,10 @@ def streaming_wrapper(
         if chunk.text:
             yield chunk.text
 
-    # Store the last chunk so citations can be extracted after streaming ends
-    st.session_state["_last_chunk"] = last
+    # Keep only the formatted citations, not the raw response object
+    candidate = last.candidates[0] if last and last.candidates else None
+    st.session_state["_last_citations"] = (
+        cite_passages(candidate, store.name or "")
+        if st.session_state.get("extended_citations")
+        else cite_documents(candidate)
+    )
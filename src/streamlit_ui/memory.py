@@ -0,0 +1,98 @@
+"""Per-session and process-wide accounting of the memory held in session state."""
+
+import os
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from .helpers import sweep_spill_dirs
+
+# Latest usage reported by each session, keyed by session id. Module-level so
+# it is shared by every session served by this process.
+_session_usage: dict[str, dict] = {}
+_usage_lock = threading.Lock()
+
+
+def _text_bytes(text: str | None) -> int:
+    return len(text.encode("utf-8")) if text else 0
+
+
+def measure_session(state=None) -> dict[str, int]:
+    """Estimate the bytes held by a session's growable state.
+
+    Args:
+        state: Session state to measure. Defaults to the current session's
+               st.session_state; the load-testing harness passes AppTest's.
+
+    Returns a mapping with ``messages``, ``pending_in_memory``,
+    ``pending_on_disk`` and ``citations`` byte counts.
+    """
+    state = state if state is not None else st.session_state
+    messages = sum(
+        _text_bytes(m.get("content")) + _text_bytes(m.get("citations"))
+        for m in state["messages"]
+    )
+    pending = state["pending_files"].values()
+    citations = state["_last_citations"] if "_last_citations" in state else None
+    return {
+        "messages": messages,
+        "pending_in_memory": sum(
+            len(e["data"]) for e in pending if e["data"] is not None
+        ),
+        "pending_on_disk": sum(e["size"] for e in pending if e["data"] is None),
+        "citations": _text_bytes(citations),
+    }
+
+
+def record_session_usage() -> dict[str, int]:
+    """Measure the current session, publish it to the process registry, and return it."""
+    usage = measure_session()
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        with _usage_lock:
+            _session_usage[ctx.session_id] = {**usage, "updated_at": time.time()}
+    return usage
+
+
+def current_rss_bytes() -> int:
+    """Return the process's current resident set size in bytes (0 where unknown).
+
+    Read from /proc/self/statm, so it is only available on Linux.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _prune_inactive_sessions() -> None:
+    """Drop registry entries and spill files of sessions the runtime no longer serves."""
+    if not Runtime.exists():
+        return
+    runtime = Runtime.instance()
+    with _usage_lock:
+        for session_id in list(_session_usage):
+            if not runtime.is_active_session(session_id):
+                del _session_usage[session_id]
+    sweep_spill_dirs()
+
+
+def process_usage() -> dict[str, int]:
+    """Return totals across all active sessions plus the process's current RSS.
+
+    ``rss`` is 0 where the platform does not report it.
+    """
+    _prune_inactive_sessions()
+    with _usage_lock:
+        entries = list(_session_usage.values())
+    totals = {
+        key: sum(e[key] for e in entries)
+        for key in ("messages", "pending_in_memory", "pending_on_disk", "citations")
+    }
+    totals["sessions"] = len(entries)
+    totals["rss"] = current_rss_bytes()
+    return totals
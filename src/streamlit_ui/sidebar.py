@@ -1,14 +1,28 @@
-"""Sidebar UI component: API key input, document upload, indexed doc list, and cleanup."""
+"""Sidebar UI component: API key input, document upload, indexing progress, indexed doc list, and cleanup."""
 
 import streamlit as st
 
 from check_docs import check_docs
-from gemini_client import create_client
-from upload_docs import upload_docs
-
-from .helpers import EXTENSIONS, save_uploaded_files
+from gemini_client import create_client, key_fingerprint
+from ingest_journal import abandon_job, failed_files, get_progress, retry_failed
+from upload_docs import (
+    create_upload_job,
+    is_upload_job_running,
+    resumable_jobs,
+    start_upload_job,
+)
+
+from .helpers import (
+    EXTENSIONS,
+    discard_pending_file,
+    save_pending_files,
+    stage_pending_file,
+)
+from .memory import process_usage, record_session_usage
 from .state import reset_session
 
+_PROGRESS_REFRESH_SECONDS = 2
+
 
 # ── API Key ──────────────────────────────────────────────────────────────────
 
@@ -60,7 +74,9 @@ def _render_file_picker() -> None:
     """Render the file uploader and merge new picks into pending_files.
 
     Uses a dynamic widget key so the picker resets to an empty state after
-    each batch, preventing the same file from appearing twice.
+    each batch, preventing the same file from appearing twice. Rotating the
+    key also lets Streamlit release the UploadedFile buffers once their
+    contents are staged.
     """
     new_files = st.file_uploader(
         "Select files",
@@ -77,7 +93,9 @@ def _render_file_picker() -> None:
                 f.name not in st.session_state.pending_files
                 and f.name not in already_indexed
             ):
-                st.session_state.pending_files[f.name] = f
+                st.session_state.pending_files[f.name] = stage_pending_file(
+                    f, st.session_state.pending_files
+                )
         st.session_state.file_uploader_key += 1
         st.rerun()
 
@@ -94,14 +112,15 @@ def _render_pending_files() -> None:
     for name in list(pending.keys()):
         col_name, col_btn = st.columns([5, 1])
         with col_name:
-            size_kb = pending[name].size / 1024
+            size_kb = pending[name]["size"] / 1024
+            where = " · on disk" if pending[name]["data"] is None else ""
             st.markdown(
-                f"📄 **{name}**  \n<small style='color:gray'>{size_kb:.1f} KB</small>",
+                f"📄 **{name}**  \n<small style='color:gray'>{size_kb:.1f} KB{where}</small>",
                 unsafe_allow_html=True,
             )
         with col_btn:
             if st.button("✕", key=f"remove_{name}", help=f"Remove {name}"):
-                del st.session_state.pending_files[name]
+                discard_pending_file(st.session_state.pending_files.pop(name))
                 st.rerun()
 
 
@@ -109,40 +128,143 @@ def _render_pending_files() -> None:
 
 
 def _render_upload_button() -> None:
-    """Render the Upload & Index button and run the indexing pipeline."""
+    """Render the Upload & Index button and start a background indexing job.
+
+    The job is journaled and runs in a worker thread, so it keeps going across
+    reruns; `_render_ingest_progress` reports on it.
+    """
     pending = st.session_state.pending_files
 
     if st.button(
         "Upload & Index",
         icon=":material/cloud_upload:",
         type="primary",
-        disabled=not pending,
+        disabled=not pending or st.session_state.ingest_job_id is not None,
         use_container_width=True,
     ):
-        with st.status("Indexing documents…", expanded=True) as status:
-            try:
-                st.write("Saving files to staging area…")
-                saved = save_uploaded_files(list(pending.values()))
-
-                def _progress(filename: str) -> None:
-                    st.write(f"✓ Indexed: **{filename}**")
-
-                store = upload_docs(
-                    file_list=saved,
-                    on_progress=_progress,
-                    client=st.session_state.gemini_client,
-                )
-                st.session_state.store = store
-                st.session_state.indexed_names = check_docs(
-                    store, client=st.session_state.gemini_client
-                )
-                st.session_state.pending_files = {}
-                status.update(
-                    label="Indexing complete!", state="complete", expanded=False
-                )
-            except Exception as e:
-                status.update(label="Indexing failed.", state="error", expanded=True)
-                st.error(f"Error during indexing: {e}")
+        try:
+            saved = save_pending_files(pending)
+            job_id = create_upload_job(
+                saved,
+                client=st.session_state.gemini_client,
+                owner=key_fingerprint(st.session_state.api_key),
+            )
+            start_upload_job(job_id, client=st.session_state.gemini_client)
+            st.session_state.ingest_job_id = job_id
+            st.session_state.pending_files = {}
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error during indexing: {e}")
+
+
+# ── Indexing progress ─────────────────────────────────────────────────────────
+
+
+def _attach_store(store_name: str) -> None:
+    """Make the job's store the session's active store and refresh its doc list."""
+    client = st.session_state.gemini_client
+    store = client.file_search_stores.get(name=store_name)
+    st.session_state.store = store
+    st.session_state.indexed_names = check_docs(store, client=client)
+
+
+@st.fragment(run_every=_PROGRESS_REFRESH_SECONDS)
+def _render_ingest_progress() -> None:
+    """Show live progress for the session's background indexing job.
+
+    Runs as a fragment so only this block polls the journal while the job
+    works; the whole app reruns once the job's store is ready.
+    """
+    job_id = st.session_state.ingest_job_id
+    progress = get_progress(job_id) if job_id else None
+    if progress is None:
+        return
+
+    label = f"Indexed {progress.indexed}/{progress.total}"
+    if progress.failed:
+        label += f" · {progress.failed} failed"
+    done = progress.indexed + progress.failed
+    st.progress(done / progress.total if progress.total else 1.0, text=label)
+
+    if is_upload_job_running(job_id):
+        st.caption(":material/sync: Indexing in the background…")
+        return
+
+    if not progress.finished:
+        st.warning("Indexing was interrupted.", icon=":material/pause_circle:")
+        col_resume, col_discard = st.columns(2)
+        with col_resume:
+            if st.button(
+                "Resume", icon=":material/play_arrow:", use_container_width=True
+            ):
+                start_upload_job(job_id, client=st.session_state.gemini_client)
+                st.rerun(scope="fragment")
+        with col_discard:
+            if st.button("Discard", use_container_width=True):
+                abandon_job(job_id)
+                st.session_state.ingest_job_id = None
+                st.rerun()
+        return
+
+    store = st.session_state.store
+    if store is None or store.name != progress.store_name:
+        try:
+            _attach_store(progress.store_name)
+        except Exception as e:
+            st.error(f"Error loading indexed documents: {e}")
+            return
+        if not progress.failed:
+            st.session_state.ingest_job_id = None
+        st.rerun()
+
+    with st.expander(":material/error: Failed files"):
+        for name, error in failed_files(job_id):
+            st.markdown(f"- **{name}**: {error}")
+    col_retry, col_dismiss = st.columns(2)
+    with col_retry:
+        if st.button("Retry", icon=":material/replay:", use_container_width=True):
+            retry_failed(job_id)
+            start_upload_job(job_id, client=st.session_state.gemini_client)
+            st.session_state.store = None
+            st.rerun(scope="fragment")
+    with col_dismiss:
+        if st.button("Dismiss", use_container_width=True):
+            st.session_state.ingest_job_id = None
+            st.rerun()
+
+
+def _render_interrupted_jobs() -> None:
+    """Offer to resume or discard this API key's jobs that nothing is running.
+
+    Covers jobs whose session is gone — a server restart, a crash, or a
+    browser refresh — since the journal outlives session state. Only jobs
+    owned by the session's API key are listed, so they resume with a client
+    that can reach their store, and jobs another process holds are skipped.
+    """
+    if st.session_state.ingest_job_id is not None:
+        return
+    for job in resumable_jobs(key_fingerprint(st.session_state.api_key)):
+        st.warning(
+            f"Found an interrupted upload job ({job.indexed}/{job.total} indexed).",
+            icon=":material/pause_circle:",
+        )
+        col_resume, col_discard = st.columns(2)
+        with col_resume:
+            if st.button(
+                "Resume",
+                key=f"resume_{job.job_id}",
+                icon=":material/play_arrow:",
+                use_container_width=True,
+            ):
+                start_upload_job(job.job_id, client=st.session_state.gemini_client)
+                st.session_state.ingest_job_id = job.job_id
+                st.rerun()
+        with col_discard:
+            if st.button(
+                "Discard", key=f"discard_{job.job_id}", use_container_width=True
+            ):
+                abandon_job(job.job_id)
+                st.rerun()
 
 
 # ── Upload section (composed) ─────────────────────────────────────────────────
@@ -154,6 +276,8 @@ def _render_upload_section() -> None:
     _render_file_picker()
     _render_pending_files()
     _render_upload_button()
+    _render_interrupted_jobs()
+    _render_ingest_progress()
 
 
 # ── Indexed documents list ────────────────────────────────────────────────────
@@ -168,6 +292,45 @@ def _render_indexed_docs_section() -> None:
     else:
         st.caption("No documents indexed.")
 
+    st.toggle(
+        "Extended citations",
+        key="extended_citations",
+        help="Quote and highlight the cited passage from each source document.",
+    )
+
+
+# ── Memory usage ──────────────────────────────────────────────────────────────
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _render_memory_section() -> None:
+    """Render session and process-wide memory accounting in an expander."""
+    session = record_session_usage()
+    totals = process_usage()
+    with st.expander(":material/memory: Memory usage"):
+        st.markdown(
+            f"**This session**  \n"
+            f"Messages: {_format_bytes(session['messages'])} "
+            f"({len(st.session_state.messages)} kept)  \n"
+            f"Pending in memory: {_format_bytes(session['pending_in_memory'])}  \n"
+            f"Pending on disk: {_format_bytes(session['pending_on_disk'])}"
+        )
+        rss = _format_bytes(totals["rss"]) if totals["rss"] else "n/a"
+        st.markdown(
+            f"**All sessions ({totals['sessions']})**  \n"
+            f"Messages: {_format_bytes(totals['messages'])}  \n"
+            f"Pending in memory: {_format_bytes(totals['pending_in_memory'])}  \n"
+            f"Pending on disk: {_format_bytes(totals['pending_on_disk'])}  \n"
+            f"Process RSS: {rss}"
+        )
+
 
 # ── Cleanup ───────────────────────────────────────────────────────────────────
 
@@ -213,3 +376,4 @@ def render_sidebar() -> None:
         st.divider()
 
         _render_cleanup_section()
+        _render_memory_section()
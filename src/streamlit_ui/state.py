@@ -5,7 +5,12 @@ import os
 import streamlit as st
 from google import genai
 
+from configs import EXTENDED_CITATIONS, MAX_CHAT_MESSAGES
+from ingest_journal import abandon_job
 from manage_docs import cleanup_docs
+from upload_docs import cancel_upload_job
+
+from .helpers import discard_pending_file
 
 
 def init_state() -> None:
@@ -22,9 +27,12 @@ def init_state() -> None:
     st.session_state.setdefault("store", None)
     st.session_state.setdefault("indexed_names", [])
     st.session_state.setdefault("messages", [])
-    st.session_state.setdefault("_last_chunk", None)
-    st.session_state.setdefault("pending_files", {})  # {filename: UploadedFile}
+    st.session_state.setdefault("messages_trimmed", 0)  # dropped past MAX_CHAT_MESSAGES
+    st.session_state.setdefault("_last_citations", None)
+    st.session_state.setdefault("pending_files", {})  # {filename: pending entry}
     st.session_state.setdefault("file_uploader_key", 0)
+    st.session_state.setdefault("ingest_job_id", None)  # background upload job
+    st.session_state.setdefault("extended_citations", EXTENDED_CITATIONS)
 
 
 def reset_session() -> None:
@@ -33,10 +41,28 @@ def reset_session() -> None:
     API key and Gemini client are intentionally preserved so the user does
     not have to re-enter their key after a reset.
     """
+    if st.session_state.ingest_job_id:
+        # The staged files are about to be deleted, so the job can never resume.
+        cancel_upload_job(st.session_state.ingest_job_id)
+        abandon_job(st.session_state.ingest_job_id)
+    st.session_state.ingest_job_id = None
     cleanup_docs()
+    for entry in st.session_state.pending_files.values():
+        discard_pending_file(entry)
     st.session_state.store = None
     st.session_state.indexed_names = []
     st.session_state.messages = []
-    st.session_state.pop("_last_chunk", None)
+    st.session_state.messages_trimmed = 0
+    st.session_state.pop("_last_citations", None)
     st.session_state.pending_files = {}
     st.session_state.file_uploader_key += 1
+
+
+def append_message(message: dict) -> None:
+    """Append a chat message, dropping the oldest beyond MAX_CHAT_MESSAGES."""
+    messages = st.session_state.messages
+    messages.append(message)
+    overflow = len(messages) - MAX_CHAT_MESSAGES
+    if overflow > 0:
+        del messages[:overflow]
+        st.session_state.messages_trimmed += overflow
@@ -1,28 +1,54 @@
 import os
-import time
+import threading
 from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from google.genai import types
 from google.genai.types import FileSearchStore
 
-from configs import DOCS_DIR, FILE_SEARCH_STORE_NAME
+import ingest_journal
+from configs import (
+    CONTENT_HASH_METADATA_KEY,
+    DOCS_DIR,
+    FILE_SEARCH_STORE_NAME,
+    INGEST_LEASE_SECONDS,
+    UPLOAD_POLL_SECONDS,
+)
 from gemini_client import client as _default_client
+from gemini_client import client_fingerprint as _default_owner
+from ingest_journal import JobProgress
+from passage_index import content_hash, ensure_index, record_documents
 
 if not os.path.exists(DOCS_DIR):
     os.makedirs(DOCS_DIR, exist_ok=True)
     print(f"Created docs directory: {DOCS_DIR}")
 
+# Background ingestion threads, keyed by job id. Lives at module level so it
+# survives Streamlit reruns (modules are imported once per process).
+_background_jobs: dict[str, tuple[threading.Thread, threading.Event]] = {}
+_background_lock = threading.Lock()
 
-def create_store(client=None) -> FileSearchStore:
-    """Create a new Gemini file search store and return it.
 
-    Args:
-        client: Optional Gemini client. Defaults to the module-level singleton.
-    """
+class IngestCancelled(Exception):
+    """Raised inside a job run when its stop event is set."""
+
+
+def _resolve_client(client):
     _client = client if client is not None else _default_client
     if _client is None:
         raise ValueError(
             "No Gemini client available. Set the GEMINI_API_KEY environment variable."
         )
+    return _client
+
+
+def create_store(client=None) -> FileSearchStore:
+    """Create a new Gemini file search store and return it.
+
+    Args:
+        client: Optional Gemini client. Defaults to the module-level singleton.
+    """
+    _client = _resolve_client(client)
     store = _client.file_search_stores.create(
         config={"display_name": FILE_SEARCH_STORE_NAME}
     )
@@ -30,14 +56,205 @@ def create_store(client=None) -> FileSearchStore:
     return store
 
 
+def create_upload_job(
+    file_list: list[str] | None = None, client=None, owner: str | None = None
+) -> str:
+    """
+    Create a file search store and journal a new upload job for it.
+
+    Nothing is read or uploaded yet; pass the returned job id to
+    `run_upload_job` (or `start_upload_job`) to do the work.
+
+    Args:
+        file_list:  Explicit list of filenames (basenames) to upload from
+                    DOCS_DIR. If None, all non-hidden files in DOCS_DIR are used.
+        client: Optional Gemini client. Defaults to the module-level singleton.
+        owner: Fingerprint of the client's API key (see
+               `gemini_client.key_fingerprint`). Defaults to GEMINI_API_KEY's.
+    """
+    _client = _resolve_client(client)
+    _owner = owner if owner is not None else _default_owner
+    if file_list is None:
+        file_list = [f for f in os.listdir(DOCS_DIR) if not f.startswith(".")]
+    store = create_store(client=_client)
+    store_name = store.name if store.name else "no_name_found"
+    return ingest_journal.create_job(store_name, file_list, owner=_owner)
+
+
+def _wait_for_operation(operation, client, stop_event: threading.Event):
+    """Poll an upload operation until it is done or the job is cancelled."""
+    while not operation.done:
+        if stop_event.wait(UPLOAD_POLL_SECONDS):
+            raise IngestCancelled()
+        operation = client.operations.get(operation)
+    return operation
+
+
+def _index_passages(store_name: str, path: str) -> None:
+    """Add an uploaded file to the local passage index used for extended citations.
+
+    Best effort: the index is optional, so a failure is logged and the file
+    stays indexed remotely. The store's manifest is only updated on success.
+    """
+    filename = os.path.basename(path)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = content_hash(data)
+        if ensure_index(digest, data, filename):
+            record_documents(store_name, {filename: digest})
+    except Exception as e:
+        print(f"Could not index {filename} for extended citations: {e}")
+
+
+def _ingest_file(
+    job_id: str,
+    store_name: str,
+    source_dir: str,
+    filename: str,
+    operation_name: str | None,
+    client,
+    stop_event: threading.Event,
+) -> None:
+    """Upload (or re-attach to) one file's operation and journal the outcome."""
+    path = os.path.join(source_dir, filename)
+    if operation_name:
+        # Re-attach to the operation started by an earlier, interrupted run.
+        operation = client.operations.get(
+            types.UploadToFileSearchStoreOperation(name=operation_name)
+        )
+    else:
+        # Marked before the call: a crash mid-request leaves the file uploading
+        # without an operation name, so the next run simply uploads it again.
+        ingest_journal.set_file_state(job_id, filename, ingest_journal.UPLOADING)
+        with open(path, "rb") as f:
+            digest = content_hash(f.read())
+        operation = client.file_search_stores.upload_to_file_search_store(
+            file=path,
+            file_search_store_name=store_name,
+            config={
+                "display_name": filename,
+                "custom_metadata": [
+                    {"key": CONTENT_HASH_METADATA_KEY, "string_value": digest}
+                ],
+            },
+        )
+        ingest_journal.set_file_state(
+            job_id, filename, ingest_journal.UPLOADING, operation_name=operation.name
+        )
+
+    operation = _wait_for_operation(operation, client, stop_event)
+    if operation.error:
+        raise RuntimeError(operation.error.get("message", str(operation.error)))
+    ingest_journal.set_file_state(job_id, filename, ingest_journal.INDEXED)
+    _index_passages(store_name, path)
+
+
+def run_upload_job(
+    job_id: str,
+    on_progress: Callable[[str], None] | None = None,
+    client=None,
+    stop_event: threading.Event | None = None,
+    max_workers: int = 1,
+) -> FileSearchStore:
+    """
+    Upload every staged or in-flight file of a journaled job and return its store.
+
+    Safe to call again on an interrupted job: indexed files are skipped and
+    files with a recorded operation are re-attached rather than re-uploaded.
+    A file that fails is journaled as failed and the job moves on. The job's
+    lease is held for the whole run, so a job another worker is running
+    raises RuntimeError instead of being uploaded twice.
+
+    Args:
+        job_id: Id returned by `create_upload_job`.
+        on_progress: Optional callback called with each filename after it finishes
+                    uploading. Defaults to printing the filename. Called from
+                    worker threads when max_workers > 1.
+        client: Optional Gemini client. Defaults to the module-level singleton
+                (used by the CLI). Pass a per-session client from the Streamlit app.
+        stop_event: Optional event that cancels the run between polls when set.
+        max_workers: Number of files uploaded and polled concurrently.
+    """
+    _client = _resolve_client(client)
+    progress = ingest_journal.get_progress(job_id)
+    if progress is None:
+        raise ValueError(f"Unknown upload job: {job_id}")
+    stop = stop_event if stop_event is not None else threading.Event()
+    source_dir = progress.source_dir or DOCS_DIR
+
+    def _process(filename: str, operation_name: str | None) -> None:
+        if stop.is_set():
+            raise IngestCancelled()
+        try:
+            _ingest_file(
+                job_id,
+                progress.store_name,
+                source_dir,
+                filename,
+                operation_name,
+                _client,
+                stop,
+            )
+        except IngestCancelled:
+            raise
+        except Exception as e:
+            ingest_journal.set_file_state(
+                job_id, filename, ingest_journal.FAILED, error=str(e)
+            )
+            print(f"Failed to upload {filename}: {e}")
+            return
+
+        if on_progress:
+            on_progress(filename)
+        else:
+            print(f"Finished uploading: {filename}")
+
+    token = ingest_journal.claim_job(job_id, INGEST_LEASE_SECONDS)
+    if token is None:
+        raise RuntimeError(f"Upload job {job_id} is already running elsewhere.")
+    try:
+        open_files = ingest_journal.open_files(job_id)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            pending = {
+                pool.submit(_process, filename, operation_name)
+                for filename, _state, operation_name in open_files
+            }
+            try:
+                while pending:
+                    done, pending = wait(
+                        pending,
+                        timeout=INGEST_LEASE_SECONDS / 3,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        future.result()
+                    if not ingest_journal.renew_lease(
+                        job_id, token, INGEST_LEASE_SECONDS
+                    ):
+                        raise RuntimeError(f"Lost the lease on upload job {job_id}.")
+            except BaseException:
+                # Ctrl-C or cancellation: stop the other workers at their next poll.
+                stop.set()
+                raise
+    finally:
+        ingest_journal.release_job(job_id, token)
+
+    return _client.file_search_stores.get(name=progress.store_name)
+
+
 def upload_docs(
     file_list: list[str] | None = None,
     on_progress: Callable[[str], None] | None = None,
     client=None,
+    owner: str | None = None,
 ) -> FileSearchStore:
     """
     Create a file search store, upload documents to it, and return the store.
 
+    The upload is journaled, so an interrupted call can be picked up later
+    with `run_upload_job` on the job listed by `resumable_jobs()`.
+
     Args:
         file_list:  Explicit list of filenames (basenames) to upload from
                     DOCS_DIR. If None, all non-hidden files in DOCS_DIR are used.
@@ -45,31 +262,86 @@ def upload_docs(
                     uploading. Defaults to printing the filename.
         client: Optional Gemini client. Defaults to the module-level singleton
                 (used by the CLI). Pass a per-session client from the Streamlit app.
+        owner: Fingerprint of the client's API key. Defaults to GEMINI_API_KEY's.
     """
-    _client = client if client is not None else _default_client
-    if _client is None:
-        raise ValueError(
-            "No Gemini client available. Set the GEMINI_API_KEY environment variable."
-        )
-    store = create_store(client=_client)
+    _client = _resolve_client(client)
+    job_id = create_upload_job(file_list, client=_client, owner=owner)
+    return run_upload_job(job_id, on_progress=on_progress, client=_client)
 
-    if file_list is None:
-        file_list = [f for f in os.listdir(DOCS_DIR) if not f.startswith(".")]
 
-    for filename in file_list:
-        operation = _client.file_search_stores.upload_to_file_search_store(
-            file=os.path.join(DOCS_DIR, filename),
-            file_search_store_name=store.name if store.name else "no_name_found",
-            config={"display_name": filename},
-        )
+# ── Background jobs ───────────────────────────────────────────────────────────
 
-        while not operation.done:
-            time.sleep(2)
-            operation = _client.operations.get(operation)
 
-        if on_progress:
-            on_progress(filename)
-        else:
-            print(f"Finished uploading: {filename}")
+def start_upload_job(job_id: str, client=None) -> None:
+    """Run a journaled job in a daemon thread; no-op if it is already running.
 
-    return store
+    Progress is read back from the journal (see `ingest_journal.get_progress`),
+    so callers such as the Streamlit sidebar can poll it across reruns.
+    """
+    _client = _resolve_client(client)
+    with _background_lock:
+        if is_upload_job_running(job_id):
+            return
+        finished = [j for j in _background_jobs if not is_upload_job_running(j)]
+        for finished_id in finished:
+            del _background_jobs[finished_id]
+        stop_event = threading.Event()
+
+        def _run() -> None:
+            try:
+                run_upload_job(
+                    job_id,
+                    on_progress=lambda _name: None,
+                    client=_client,
+                    stop_event=stop_event,
+                )
+            except IngestCancelled:
+                pass
+            except Exception as e:
+                print(f"Upload job {job_id} stopped: {e}")
+
+        thread = threading.Thread(target=_run, name=f"upload-job-{job_id}", daemon=True)
+        _background_jobs[job_id] = (thread, stop_event)
+        thread.start()
+
+
+def is_upload_job_running(job_id: str) -> bool:
+    """Return True while a background thread is working on the job."""
+    entry = _background_jobs.get(job_id)
+    return entry is not None and entry[0].is_alive()
+
+
+def cancel_upload_job(job_id: str) -> None:
+    """Ask a background job to stop; its journal is left resumable.
+
+    The job keeps counting as running until its thread exits, which may be
+    mid-request, so it cannot be started a second time in the meantime.
+    """
+    entry = _background_jobs.get(job_id)
+    if entry is not None:
+        entry[1].set()
+
+
+def resumable_jobs(
+    owner: str | None = None, snapshots: bool = False
+) -> list[JobProgress]:
+    """Return the owner's unfinished jobs that nothing is running, oldest first.
+
+    A job counts as running while a thread of this process works on it or
+    while any process holds its lease.
+
+    Args:
+        owner: Fingerprint of the API key whose jobs to list. Defaults to
+               GEMINI_API_KEY's.
+        snapshots: List snapshot imports (staged outside DOCS_DIR) instead of
+                   regular upload jobs.
+    """
+    _owner = owner if owner is not None else _default_owner
+    return [
+        job
+        for job in ingest_journal.unfinished_jobs()
+        if job.owner == _owner
+        and (job.source_dir is not None) == snapshots
+        and not job.leased
+        and not is_upload_job_running(job.job_id)
+    ]